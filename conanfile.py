@@ -14,8 +14,21 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import hashlib
+import json
+import os
+
 from conans import ConanFile, tools
-from conan.tools.cmake import CMakeToolchain, CMake
+from conans.errors import ConanInvalidConfiguration
+from conan.tools.build import build_jobs
+from conan.tools.cmake import CMakeDeps, CMakeToolchain, CMake, cmake_layout
+from conan.tools.env import VirtualBuildEnv
+from conan.tools.files import update_conandata
+
+_RESOLVER_BACKEND_DEFINES = {
+    "libdw": "HINDSIGHT_RESOLVER_BACKEND=HINDSIGHT_RESOLVER_BACKEND_LIBDW",
+    "libbacktrace": "HINDSIGHT_RESOLVER_BACKEND=HINDSIGHT_RESOLVER_BACKEND_LIBBACKTRACE",
+}
 
 
 class HindsightConan(ConanFile):
@@ -27,7 +40,7 @@ class HindsightConan(ConanFile):
     description = "A C++ stack trace library"
     topics = "hindsight", "stacktrace", "stack", "trace", "backtrace", "debug"
     homepage = url
-    generators = "cmake_find_package"
+    no_copy_source = True
 
     settings = "os", "arch", "compiler", "build_type"
     options = {
@@ -35,18 +48,26 @@ class HindsightConan(ConanFile):
         "fPIC": [False, True],
         "with_fmt": [False, True],
         "resolver_backend": ["libdw", "libbacktrace"],
+        "lto": ["auto", "off", "thin", "full"],
+        "enable_lld_thinlto_cache": [False, True],
+        "use_lld": [False, True],
         "build_tests": [False, True],
         "build_examples": [False, True],
         "build_docs": [False, True],
+        "enable_parallel_presets": [False, True],
     }
     default_options = {
         "shared": False,
         "fPIC": True,
         "with_fmt": False,
         "resolver_backend": "libdw",
+        "lto": "auto",
+        "enable_lld_thinlto_cache": False,
+        "use_lld": False,
         "build_tests": False,
         "build_examples": False,
         "build_docs": False,
+        "enable_parallel_presets": True,
 
         "libunwind:coredump": False,
         "libunwind:ptrace": False,
@@ -54,6 +75,60 @@ class HindsightConan(ConanFile):
     }
 
     _fmt_package_name = "fmt/[^8.0.1]"
+    _cmake_generator = "Ninja Multi-Config"
+    _compatible_cppstds = ["20", "gnu20", "23", "gnu23"]
+    _minimum_compiler_versions = {
+        "gcc": "10",
+        "clang": "13",
+        "apple-clang": "14",
+        "Visual Studio": "16",
+        "msvc": "192",
+    }
+
+    @property
+    def _build_tests(self):
+        return bool(self.options.build_tests) and \
+            not self.conf.get("tools.graph:skip_test", default=False, check_type=bool)
+
+    @property
+    def _build_docs(self):
+        return bool(self.options.build_docs) and \
+            not self.conf.get("tools.graph:skip_build", default=False, check_type=bool)
+
+    @property
+    def _lto(self):
+        if self.options.lto == "auto":
+            return "thin" if self.options.shared else "off"
+        return str(self.options.lto)
+
+    @property
+    def _supports_fat_lto_objects(self):
+        compiler = self.settings.get_safe("compiler")
+        if compiler == "gcc":
+            return True
+        return compiler == "clang" and self.settings.os == "Linux" and \
+            tools.Version(self.settings.compiler.version) >= "18"
+
+    def _set_build_presets_jobs(self, presets_path):
+        if not os.path.isfile(presets_path):
+            return
+        with open(presets_path) as presets_file:
+            presets = json.load(presets_file)
+        build_presets = presets.get("buildPresets", [])
+        if build_presets:
+            for build_preset in build_presets:
+                build_preset["jobs"] = build_jobs(self)
+            with open(presets_path, "w") as presets_file:
+                json.dump(presets, presets_file, indent=4)
+        for included_path in presets.get("include", []):
+            self._set_build_presets_jobs(os.path.join(os.path.dirname(presets_path), included_path))
+
+    def export(self):
+        cache_key = hashlib.blake2b(digest_size=8)
+        for file_name in ("conanfile.py", "CMakeLists.txt"):
+            with open(os.path.join(self.recipe_folder, file_name), "rb") as file:
+                cache_key.update(file.read())
+        update_conandata(self, {"cache_key": cache_key.hexdigest()})
 
     def config_options(self):
         if self.settings.os != "Linux":
@@ -65,34 +140,62 @@ class HindsightConan(ConanFile):
             self.requires(self._fmt_package_name)
         if self.settings.os != "Windows":
             self.requires("libunwind/[^1.5.0]")
-        if (self.settings.os != "Windows" and self.settings.os != "Linux") or \
-                (self.settings.os == "Linux" and self.options.resolver_backend == "libbacktrace"):
+        if self._uses_libbacktrace:
             self.requires("libbacktrace/cci.20210118")
 
     def build_requirements(self):
-        if self.options.build_examples:
+        self.build_requires("ninja/[^1.11.0]")
+        if self.options.build_examples and not self.options.with_fmt:
             self.build_requires(self._fmt_package_name, force_host_context=True)
-        if self.options.build_tests:
+        if self._build_tests:
             self.build_requires("catch2/[^2.13.7]", force_host_context=True)
-        if self.options.build_docs:
-            self.build_requires("doxygen/[^1.9.2]")
+        if self._build_docs:
+            self.build_requires("doxygen/[^1.9.2]", force_host_context=False)
 
     def configure(self):
         if self.settings.os == "Windows" or self.options.shared:
             del self.options.fPIC
+        # Computed here rather than in config_options() because user option values are only applied after it
+        uses_libdw = self.settings.os == "Linux" and self.options.resolver_backend == "libdw"
+        self._uses_libbacktrace = self.settings.os != "Windows" and not uses_libdw
 
     def validate(self):
-        tools.check_min_cppstd(self, 20)
+        if self.settings.get_safe("compiler.cppstd"):
+            tools.check_min_cppstd(self, 20)
+        else:
+            # The build requests C++20 itself, so only the compiler's support for it has to be checked
+            compiler = str(self.settings.compiler)
+            minimum_version = self._minimum_compiler_versions.get(compiler)
+            if minimum_version and tools.Version(self.settings.compiler.version) < minimum_version:
+                raise ConanInvalidConfiguration(
+                    f"{self.name} requires C++20 support, which {compiler} {self.settings.compiler.version} lacks "
+                    f"(at least version {minimum_version} is required)")
+        if not self.options.shared and self._lto != "off" and not self._supports_fat_lto_objects:
+            raise ConanInvalidConfiguration(
+                f"{self.name}: LTO of a static library requires fat LTO objects, which are only supported by GCC and "
+                f"Clang 18 or newer on Linux")
+
+    def layout(self):
+        cmake_layout(self, generator=self._cmake_generator)
 
     def generate(self):
-        toolchain = CMakeToolchain(self)
+        toolchain = CMakeToolchain(self, generator=self._cmake_generator)
+        toolchain.variables["CMAKE_OPTIMIZE_DEPENDENCIES"] = True
+        toolchain.variables["CMAKE_EXPORT_COMPILE_COMMANDS"] = True
         toolchain.variables["HINDSIGHT_WITH_FMT"] = self.options.with_fmt
         if self.settings.os == "Linux":
             toolchain.variables["HINDSIGHT_RESOLVER_BACKEND"] = self.options.resolver_backend
-        toolchain.variables["HINDSIGHT_BUILD_TESTS"] = self.options.build_tests
+        toolchain.variables["HINDSIGHT_LTO"] = self._lto
+        toolchain.variables["HINDSIGHT_ENABLE_LLD_THINLTO_CACHE"] = self.options.enable_lld_thinlto_cache
+        toolchain.variables["HINDSIGHT_USE_LLD"] = self.options.use_lld
+        toolchain.variables["HINDSIGHT_BUILD_TESTS"] = self._build_tests
         toolchain.variables["HINDSIGHT_BUILD_EXAMPLES"] = self.options.build_examples
-        toolchain.variables["HINDSIGHT_BUILD_DOCS"] = self.options.build_docs
+        toolchain.variables["HINDSIGHT_BUILD_DOCS"] = self._build_docs
         toolchain.generate()
+        if self.options.enable_parallel_presets:
+            self._set_build_presets_jobs(os.path.join(self.generators_folder, "CMakePresets.json"))
+        CMakeDeps(self).generate()
+        VirtualBuildEnv(self).generate()
 
     scm = {
         "type": "git",
@@ -104,28 +207,59 @@ class HindsightConan(ConanFile):
         cmake = CMake(self)
         cmake.configure()
         cmake.build()
-        if self.options.build_tests:
+        if self._build_tests:
             cmake.test(output_on_failure=True)
 
     def package(self):
         self.copy("LICENSE.txt", dst="licenses")
         self.copy("NOTICE.txt", dst="licenses")
         cmake = CMake(self)
-        cmake.configure()
         cmake.install()
 
     def package_info(self):
         self.cpp_info.libs.append("hindsight")
-        if self.settings.os == "Linux":
-            self.cpp_info.system_libs.append("pthread")
         if self.options.with_fmt:
             self.cpp_info.defines.append("HINDSIGHT_WITH_FMT")
         if self.options.shared:
             self.cpp_info.defines.append("HINDSIGHT_SHARED")
-        if self.settings.os == "Linux" and self.options.resolver_backend != "libdw":
-            backend_macro = f"HINDSIGHT_RESOLVER_BACKEND_{str(self.options.resolver_backend).upper()}"
-            self.cpp_info.defines.append(f"HINDSIGHT_RESOLVER_BACKEND={backend_macro}")
+        if self.settings.os == "Linux":
+            self.cpp_info.system_libs.append("pthread")
+            resolver_backend = str(self.options.resolver_backend)
+            if resolver_backend != "libdw":
+                self.cpp_info.defines.append(_RESOLVER_BACKEND_DEFINES[resolver_backend])
 
     def package_id(self):
         del self.info.options.build_tests
         del self.info.options.build_examples
+        del self.info.options.enable_parallel_presets
+        del self.info.options.enable_lld_thinlto_cache
+        del self.info.options.use_lld
+        self.info.options.lto = self._lto
+
+        # Compatible packages are also used for invalid configurations, which must not get a C++20 binary
+        if self.info.invalid:
+            return
+        compiler = self.settings.get_safe("compiler")
+        compiler_version = str(self.settings.get_safe("compiler.version"))
+        compiler_versions = [compiler_version]
+        if compiler in ("gcc", "clang") and "." in compiler_version:
+            compiler_versions.append(compiler_version.split(".")[0])
+        cppstd = self.settings.get_safe("compiler.cppstd")
+        if cppstd in self._compatible_cppstds:
+            # A binary built with an older standard may lack symbols, e.g. those which depend on <format>
+            cppstd_version = cppstd.replace("gnu", "")
+            has_gnu_dialects = compiler in ("gcc", "clang", "apple-clang")
+            cppstds = [compatible_cppstd for compatible_cppstd in self._compatible_cppstds
+                       if compatible_cppstd.replace("gnu", "") >= cppstd_version and
+                       (has_gnu_dialects or not compatible_cppstd.startswith("gnu"))]
+        else:
+            cppstds = [cppstd]
+        for compatible_version in compiler_versions:
+            for compatible_cppstd in cppstds:
+                if compatible_version == compiler_version and compatible_cppstd == cppstd:
+                    continue
+                compatible_package = self.info.clone()
+                compatible_package.settings.compiler.version = compatible_version
+                if compatible_cppstd is not None:
+                    compatible_package.settings.compiler.cppstd = compatible_cppstd
+                self.compatible_packages.append(compatible_package)
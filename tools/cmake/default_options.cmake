@@ -33,12 +33,70 @@ elseif (CMAKE_CXX_COMPILER_ID STREQUAL "Clang" OR CMAKE_CXX_COMPILER_ID STREQUAL
     target_compile_options(hindsight_default_options INTERFACE -Wall -Wextra -Wpedantic)
 endif ()
 
-if (HINDSIGHT_ENABLE_LLD_THINLTO_CACHE AND CMAKE_CXX_COMPILER_ID STREQUAL "Clang")
+if (NOT HINDSIGHT_LTO STREQUAL "off")
+    include(CheckIPOSupported)
+    check_ipo_supported(
+        RESULT LTO_SUPPORTED
+        OUTPUT LTO_OUTPUT
+        LANGUAGES CXX)
+    if (LTO_SUPPORTED)
+        set(CMAKE_INTERPROCEDURAL_OPTIMIZATION_RELEASE ON)
+        set(CMAKE_INTERPROCEDURAL_OPTIMIZATION_RELWITHDEBINFO ON)
+        set(LTO_CONFIGS "$<CONFIG:Release,RelWithDebInfo>")
+        if (CMAKE_CXX_COMPILER_ID MATCHES "Clang" AND HINDSIGHT_LTO STREQUAL "full")
+            # CMake uses ThinLTO for Clang, the last -flto flag wins
+            target_compile_options(hindsight_default_options INTERFACE $<${LTO_CONFIGS}:-flto=full>)
+        endif ()
+        if (NOT BUILD_SHARED_LIBS)
+            # Fat objects keep the static library usable by consumers without LTO
+            set(FAT_LTO_OBJECTS_SUPPORTED OFF)
+            if (CMAKE_CXX_COMPILER_ID STREQUAL "GNU")
+                set(FAT_LTO_OBJECTS_SUPPORTED ON)
+            elseif (
+                CMAKE_CXX_COMPILER_ID STREQUAL "Clang"
+                AND CMAKE_SYSTEM_NAME STREQUAL "Linux"
+                AND CMAKE_CXX_COMPILER_VERSION VERSION_GREATER_EQUAL 18)
+                set(FAT_LTO_OBJECTS_SUPPORTED ON)
+            endif ()
+            if (FAT_LTO_OBJECTS_SUPPORTED)
+                target_compile_options(hindsight_default_options INTERFACE $<${LTO_CONFIGS}:-ffat-lto-objects>)
+            else ()
+                message(WARNING "hindsight: The static library will only be usable with the toolchain that built it")
+            endif ()
+        endif ()
+    else ()
+        message(WARNING "hindsight: Link-time optimization is not supported: ${LTO_OUTPUT}")
+    endif ()
+endif ()
+
+if (HINDSIGHT_USE_LLD
+    AND CMAKE_CXX_COMPILER_ID STREQUAL "Clang"
+    AND CMAKE_SYSTEM_NAME STREQUAL "Linux")
+    cmake_host_system_information(RESULT LLD_JOBS QUERY NUMBER_OF_LOGICAL_CORES)
+    target_link_options(hindsight_default_options INTERFACE -fuse-ld=lld -Wl,--threads=${LLD_JOBS})
+    if (LTO_SUPPORTED AND HINDSIGHT_LTO STREQUAL "thin")
+        target_link_options(hindsight_default_options INTERFACE $<${LTO_CONFIGS}:-Wl,--thinlto-jobs=${LLD_JOBS}>)
+    endif ()
+endif ()
+
+if (HINDSIGHT_ENABLE_LLD_THINLTO_CACHE AND CMAKE_CXX_COMPILER_ID MATCHES "Clang")
     set(THINLTO_CACHE_DIR "${CMAKE_BINARY_DIR}/thinlto-cache")
+    set(THINLTO_CACHE_POLICY "cache_size_bytes=5g:prune_after=24h")
     if (CMAKE_SYSTEM_NAME STREQUAL "Windows")
-        target_link_options(hindsight_default_options INTERFACE -lldltocache:${THINLTO_CACHE_DIR})
+        target_link_options(
+            hindsight_default_options
+            INTERFACE
+            -lldltocache:${THINLTO_CACHE_DIR}
+            -lldltocachepolicy:${THINLTO_CACHE_POLICY})
+    elseif (CMAKE_SYSTEM_NAME STREQUAL "Darwin")
+        target_link_options(
+            hindsight_default_options INTERFACE -Wl,-cache_path_lto,${THINLTO_CACHE_DIR} -Wl,-prune_after_lto,86400)
     else ()
-        target_link_options(hindsight_default_options INTERFACE -Wl,--thinlto-cache-dir=${THINLTO_CACHE_DIR})
+        target_link_options(
+            hindsight_default_options
+            INTERFACE
+            -Wl,--thinlto-cache-dir=${THINLTO_CACHE_DIR}
+            -Wl,--thinlto-cache-policy=${THINLTO_CACHE_POLICY})
     endif ()
 endif ()
 